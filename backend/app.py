@@ -2,6 +2,7 @@ from gevent import monkey
 monkey.patch_all()
 
 import os
+import gevent
 from flask import Flask, request
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
@@ -29,6 +30,28 @@ socketio = SocketIO(
     cors_credentials=True
 )
 
+class ProgressBatcher:
+    def __init__(self, max_size=25, max_interval=0.1):
+        self.max_size = max_size
+        self.max_interval = max_interval
+        self.buffer = []
+        self.timer = None
+
+    def add(self, event):
+        self.buffer.append(event)
+        if len(self.buffer) >= self.max_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = gevent.spawn_later(self.max_interval, self.flush)
+
+    def flush(self):
+        timer, self.timer = self.timer, None
+        if timer is not None and timer is not gevent.getcurrent():
+            timer.kill(block=False)
+        if self.buffer:
+            socketio.emit('progress_batch', self.buffer)
+            self.buffer = []
+
 @app.route('/health', methods=['GET'])
 def health():
     return {'status': 'ok'}, 200
@@ -62,6 +85,11 @@ def handle_removal(data):
         delay = float(data.get('delay', 0.5))
     except (ValueError, TypeError):
         delay = 0.5
+
+    try:
+        concurrency = int(os.getenv('REMOVE_CONCURRENCY', 8))
+    except ValueError:
+        concurrency = 8
     
     print(f'Request from user: {username}, type: {vote_type}', flush=True)
 
@@ -71,6 +99,7 @@ def handle_removal(data):
         return
 
     def process():
+        batcher = ProgressBatcher()
         try:
             def send_progress(message, status, stats=None):
                 fixed_stats = stats or {"total": 0, "removed": 0, "failed": 0}
@@ -83,9 +112,13 @@ def handle_removal(data):
                     for key in ['post_id', 'url', 'success']:
                         if key in fixed_stats:
                             emit_data[key] = fixed_stats[key]
+                if 'post_id' in emit_data:
+                    batcher.add(emit_data)
+                    return
+                batcher.flush()
                 socketio.emit('progress', emit_data)
 
-            remover = RedditVoteRemover(cookies)
+            remover = RedditVoteRemover(cookies, concurrency=concurrency)
             result = {}
 
             if vote_type in ['upvotes', 'both']:
@@ -109,6 +142,7 @@ def handle_removal(data):
             socketio.emit('complete', {'stats': final_stats})
 
         except Exception as e:
+            batcher.flush()
             app.logger.error(f'Removal error: {str(e)}')
             socketio.emit('error', {'message': 'An error occurred during removal'})
 
@@ -1,9 +1,15 @@
 import re
 import time
 from enum import Enum
-from typing import Callable, Dict, Optional, Set
+from typing import Callable, Dict, Optional, Set, Tuple
 
+import gevent
+import gevent.lock
+import orjson
 import requests
+from gevent.pool import Pool
+from gevent.queue import Queue
+from requests.adapters import HTTPAdapter
 
 
 class VoteType(Enum):
@@ -20,17 +26,99 @@ class VoteState(Enum):
 ProgressCallback = Callable[[str, str, Optional[Dict]], None]
 
 
+class RateController:
+    THROTTLE_STATUSES = (429, 503)
+
+    def __init__(
+        self,
+        initial: float = 0.3,
+        min_delay: float = 0.05,
+        max_delay: float = 5.0,
+        step: float = 0.02,
+        factor: float = 1.5,
+    ):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.step = step
+        self.factor = factor
+        self.delay = initial
+        self._lock = gevent.lock.Semaphore()
+        self._next_slot = 0.0
+
+    def set_floor(self, min_delay: float):
+        self.min_delay = min(self.max_delay, min_delay)
+        self.delay = max(self.delay, self.min_delay)
+
+    def on_ok(self):
+        self.delay = max(self.min_delay, self.delay - self.step)
+
+    def on_throttle(self):
+        self.delay = min(self.max_delay, self.delay * self.factor)
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + self.delay)
+
+    def observe(self, response: requests.Response):
+        remaining = response.headers.get("x-ratelimit-remaining")
+        try:
+            exhausted = remaining is not None and float(remaining) < 1
+        except ValueError:
+            exhausted = False
+
+        if response.status_code in self.THROTTLE_STATUSES or exhausted:
+            self.on_throttle()
+        elif response.status_code < 300:
+            self.on_ok()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.delay
+        gevent.sleep(slot - now)
+
+
 class RedditVoteRemover:
-    POST_ID_PATTERN = re.compile(r'(?:id|post-id|data-ks-id)="(t3_[a-z0-9]+)"', re.I)
-    AFTER_PATTERN = re.compile(r'(?:after=|"after":\s*")([^"&]+)', re.I)
+    PAGE_PATTERN = re.compile(
+        r'id="(t3_[a-z0-9]+)"|(?:after=|"after":\s*")([^"&]+)',
+        re.I,
+    )
     BASE_URL = "https://www.reddit.com"
+    PAGE_LIMIT = 100
+    PAGE_RETRIES = 3
+    MIN_DELAY = 0.3
+    MAX_STALE_PAGES = 1
 
-    def __init__(self, cookies: str, session: Optional[requests.Session] = None):
-        self.session = session or requests.Session()
+    def __init__(
+        self,
+        cookies: str,
+        session: Optional[requests.Session] = None,
+        concurrency: int = 8,
+    ):
+        self.concurrency = max(1, concurrency)
+        self._owns_session = session is None
+        if self._owns_session:
+            session = requests.Session()
+            session.mount(
+                "https://",
+                HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency + 1),
+            )
+        self.session = session
         self.graphql_url = f"{self.BASE_URL}/svc/shreddit/graphql"
         self._configure_session()
         self._set_cookies(cookies)
-        self.csrf_token = self.session.cookies.get("csrf_token")
+        self._csrf_lock = gevent.lock.Semaphore()
+        self._stale_csrf_tokens: Set[Optional[str]] = set()
+        self._vote_input: Dict[str, Optional[str]] = {"postId": None, "voteState": None}
+        self._vote_payload = {
+            "operation": "UpdatePostVoteState",
+            "variables": {"input": self._vote_input},
+            "csrf_token": None,
+        }
+        self.rate_controller = RateController()
+
+    @property
+    def csrf_token(self) -> Optional[str]:
+        return self.session.cookies.get("csrf_token", domain=".reddit.com")
 
     def _configure_session(self):
         self.session.headers.update(
@@ -45,11 +133,31 @@ class RedditVoteRemover:
         )
 
     def _set_cookies(self, cookie_string: str):
-        for cookie in cookie_string.split(";"):
-            if "=" not in cookie:
-                continue
-            key, value = cookie.strip().split("=", 1)
-            self.session.cookies.set(key.strip(), value.strip(), domain=".reddit.com")
+        pairs = (
+            cookie.split("=", 1) for cookie in cookie_string.split(";") if "=" in cookie
+        )
+        parsed = {key.strip(): value.strip() for key, value in pairs}
+
+        jar = requests.cookies.RequestsCookieJar()
+        for key, value in parsed.items():
+            jar.set_cookie(
+                requests.cookies.create_cookie(key, value, domain=".reddit.com")
+            )
+        if self._owns_session:
+            self.session.cookies = jar
+        else:
+            self.session.cookies.update(jar)
+
+    def _request(
+        self, method: str, url: str, retries: int = 1, **kwargs
+    ) -> requests.Response:
+        for attempt in range(retries + 1):
+            self.rate_controller.wait()
+            response = self.session.request(method, url, **kwargs)
+            self.rate_controller.observe(response)
+            if response.status_code not in RateController.THROTTLE_STATUSES:
+                break
+        return response
 
     @staticmethod
     def _send_progress(
@@ -65,50 +173,125 @@ class RedditVoteRemover:
         except Exception:
             pass
 
-    def _vote(self, post_id: str, vote_state: VoteState) -> bool:
-        if not self.csrf_token:
-            return False
-
-        payload = {
-            "operation": "UpdatePostVoteState",
-            "variables": {"input": {"postId": post_id, "voteState": vote_state.value}},
-            "csrf_token": self.csrf_token,
-        }
+    def _refresh_csrf(self, stale_token: Optional[str]) -> bool:
+        with self._csrf_lock:
+            if self.csrf_token != stale_token:
+                return bool(self.csrf_token)
+            if stale_token in self._stale_csrf_tokens:
+                return False
+            self._stale_csrf_tokens.add(stale_token)
+
+            try:
+                response = self._request("GET", f"{self.BASE_URL}/", timeout=10)
+            except Exception:
+                return False
+
+            token = response.cookies.get("csrf_token")
+            if token:
+                self.session.cookies.set("csrf_token", token, domain=".reddit.com")
+            return bool(self.csrf_token) and self.csrf_token != stale_token
+
+    def _vote_once(
+        self, post_id: str, vote_state: VoteState, csrf_token: str
+    ) -> Tuple[bool, int]:
+        # Encoded before any greenlet switch, so sharing the template is safe.
+        self._vote_input["postId"] = post_id
+        self._vote_input["voteState"] = vote_state.value
+        self._vote_payload["csrf_token"] = csrf_token
+        body = orjson.dumps(self._vote_payload)
 
         try:
-            response = self.session.post(self.graphql_url, json=payload, timeout=10)
-            result = response.json()
-            return (
+            response = self._request("POST", self.graphql_url, data=body, timeout=10)
+            if response.status_code in (401, 403):
+                return False, response.status_code
+            result = orjson.loads(response.content)
+            ok = (
                 result.get("data", {})
                 .get("updatePostVoteState", {})
                 .get("ok", False)
             )
+            return ok, response.status_code
         except Exception:
-            return False
+            return False, 0
+
+    def _vote(self, post_id: str, vote_state: VoteState) -> bool:
+        token = self.csrf_token
+        if not token:
+            if not self._refresh_csrf(token):
+                return False
+            token = self.csrf_token
+
+        ok, status = self._vote_once(post_id, vote_state, token)
+        if status in (401, 403) and self._refresh_csrf(token):
+            ok, _ = self._vote_once(post_id, vote_state, self.csrf_token)
+        return ok
+
+    def _parse_page(self, html: str) -> Tuple[Set[str], Optional[str]]:
+        post_ids: Set[str] = set()
+        after = None
+        for post_id, cursor in self.PAGE_PATTERN.findall(html):
+            if post_id:
+                post_ids.add(post_id)
+            elif after is None:
+                after = cursor.replace("%3D", "=")
+        return post_ids, after
+
+    def _fetch_pages(self, username: str, vote_type: VoteType, pages: Queue):
+        voted_url = f"{self.BASE_URL}/user/{username}/{vote_type.value}/"
+        after = None
+
+        try:
+            while True:
+                url = (
+                    f"{self.BASE_URL}/svc/shreddit/profiles/profile_{vote_type.value}-more-posts/new/"
+                    if after
+                    else voted_url
+                )
+                params = (
+                    {"after": after, "name": username, "limit": self.PAGE_LIMIT}
+                    if after
+                    else None
+                )
+
+                response = self._request(
+                    "GET", url, retries=self.PAGE_RETRIES, params=params, timeout=10
+                )
+                if response.status_code != 200:
+                    pages.put((response, set()))
+                    break
+
+                post_ids, next_after = self._parse_page(response.text)
+                pages.put((response, post_ids))
+
+                if not post_ids or not next_after or next_after == after:
+                    break
+
+                after = next_after
+        except Exception as exc:
+            pages.put(exc)
+
+        pages.put(StopIteration)
 
     def _get_voted_posts(
         self, username: str, vote_type: VoteType, debug: bool = False
     ) -> Set[str]:
         all_post_ids: Set[str] = set()
-        voted_url = f"{self.BASE_URL}/user/{username}/{vote_type.value}/"
-        after = None
-        page = 1
+        pages: Queue = Queue(maxsize=1)
+        stale_pages = 0
 
         original_accept = self.session.headers.get("Accept")
         self.session.headers[
             "Accept"
         ] = "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
 
+        producer = gevent.spawn(self._fetch_pages, username, vote_type, pages)
+
         try:
-            while True:
-                url = (
-                    f"{self.BASE_URL}/svc/shreddit/profiles/profile_{vote_type.value}-more-posts/new/"
-                    if after
-                    else voted_url
-                )
-                params = {"after": after, "name": username} if after else None
+            for page, item in enumerate(pages, 1):
+                if isinstance(item, Exception):
+                    raise item
 
-                response = self.session.get(url, params=params, timeout=10)
+                response, post_ids = item
 
                 if response.status_code == 404:
                     if debug:
@@ -119,28 +302,19 @@ class RedditVoteRemover:
                     return set()
 
                 response.raise_for_status()
-                html = response.text
 
-                post_ids = set(self.POST_ID_PATTERN.findall(html))
-                all_post_ids.update(post_ids)
+                new_ids = post_ids - all_post_ids
+                all_post_ids |= new_ids
 
                 if debug:
                     print(
-                        f"Page {page}: +{len(post_ids)} posts (Total: {len(all_post_ids)})"
+                        f"Page {page}: +{len(new_ids)} posts (Total: {len(all_post_ids)})"
                     )
 
-                after_matches = self.AFTER_PATTERN.findall(html)
-                next_after = (
-                    after_matches[0].replace("%3D", "=") if after_matches else None
-                )
-
-                if not next_after or next_after == after or not post_ids:
+                stale_pages = 0 if new_ids else stale_pages + 1
+                if not post_ids or stale_pages > self.MAX_STALE_PAGES:
                     break
 
-                after = next_after
-                page += 1
-                time.sleep(0.3)
-
             return all_post_ids
 
         except Exception as exc:
@@ -149,6 +323,7 @@ class RedditVoteRemover:
             return all_post_ids
 
         finally:
+            producer.kill()
             if original_accept:
                 self.session.headers["Accept"] = original_accept
 
@@ -159,9 +334,11 @@ class RedditVoteRemover:
         delay: float = 0.5,
         debug: bool = False,
         progress_callback: Optional[ProgressCallback] = None,
+        force_toggle: bool = False,
     ) -> Dict[str, int]:
         vote_state = VoteState.UP if vote_type == VoteType.UPVOTED else VoteState.DOWN
         stats = {"total": 0, "removed": 0, "failed": 0}
+        self.rate_controller.set_floor(max(self.MIN_DELAY, delay))
 
         if debug:
             print(f"\n{'=' * 50}\nRemoving {vote_type.value}...")
@@ -188,43 +365,23 @@ class RedditVoteRemover:
         if debug:
             print(f"\nProcessing {len(post_ids)} posts...\n")
 
-        post_url_map = {}
-        try:
-            html = None
-            if post_ids and username and vote_type:
-                voted_url = f"{self.BASE_URL}/user/{username}/{vote_type.value}/"
-                first_html_resp = self.session.get(voted_url, timeout=10)
-                if first_html_resp.status_code == 200:
-                    html = first_html_resp.text
-                    for post_id in post_ids:
-                        post_id_short = post_id[3:]
-                        pattern = re.compile(
-                            r'<a[^>]*href=["\'](/r/[^/]+/comments/[^"\']*' + re.escape(post_id_short) + r'[^"\']*)["\'][^>]*>',
-                            re.I
-                        )
-                        for match in pattern.finditer(html):
-                            sub_url = match.group(1)
-                            if sub_url.startswith('/'):
-                                sub_url = f"https://www.reddit.com{sub_url}"
-                            post_url_map[post_id] = sub_url
-                            break
-        except Exception:
-            pass
-
-        for i, post_id in enumerate(post_ids, 1):
-            self._vote(post_id, vote_state)
-            time.sleep(0.3)
+        def _process_one(post_id: str) -> Tuple[str, bool]:
+            if force_toggle:
+                self._vote(post_id, vote_state)
+            success = self._vote(post_id, VoteState.NONE)
+            return post_id, success
 
-            if self._vote(post_id, VoteState.NONE):
+        pool = Pool(size=self.concurrency)
+        results = pool.imap_unordered(_process_one, sorted(post_ids))
+        for i, (post_id, success) in enumerate(results, 1):
+            if success:
                 stats["removed"] += 1
                 message = f"[{i}/{stats['total']}] ✓ {post_id}"
-                success = True
             else:
                 stats["failed"] += 1
                 message = f"[{i}/{stats['total']}] ✗ {post_id}"
-                success = False
 
-            url = post_url_map.get(post_id, f"https://www.reddit.com/comments/{post_id[3:]}")
+            url = f"{self.BASE_URL}/comments/{post_id[3:]}"
             if progress_callback:
                 self._send_progress(
                     progress_callback,
@@ -236,9 +393,6 @@ class RedditVoteRemover:
             if debug:
                 print(message)
 
-            if i < stats["total"]:
-                time.sleep(max(0.3, delay))
-
         if debug:
             print(
                 f"\n{'=' * 50}\nRemoved: {stats['removed']}/{stats['total']} | "
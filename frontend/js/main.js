@@ -89,17 +89,23 @@ removalForm.addEventListener('submit', (e) => {
 });
 
 socket.on('progress', (data) => {
-    if (data.url && data.post_id !== undefined && data.success !== undefined) {
-        addPostLog(data.post_id, data.url, data.success, data.message);
-    } else {
-        addLog(data.message, data.status === 'success' ? 'success' : (data.status === 'error' ? 'error' : 'info'));
-    }
+    addProgressLog(data);
     
     if (data.stats) {
         updateStats(data.stats);
     }
 });
 
+socket.on('progress_batch', (events) => {
+    if (!events || !events.length) return;
+    events.forEach(addProgressLog);
+
+    const last = events[events.length - 1];
+    if (last.stats) {
+        updateStats(last.stats);
+    }
+});
+
 socket.on('complete', (data) => {
     startBtn.disabled = false;
     btnText.textContent = 'Start Removal';
@@ -121,6 +127,14 @@ socket.on('error', (data) => {
     alert(`Error: ${data.message}`);
 });
 
+function addProgressLog(data) {
+    if (data.url && data.post_id !== undefined && data.success !== undefined) {
+        addPostLog(data.post_id, data.url, data.success, data.message);
+    } else {
+        addLog(data.message, data.status === 'success' ? 'success' : (data.status === 'error' ? 'error' : 'info'));
+    }
+}
+
 function addLog(message, type = 'info') {
     const entry = document.createElement('div');
     entry.className = `log-entry ${type}`;